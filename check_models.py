@@ -1,7 +1,7 @@
 import google.generativeai as genai
 import os
+import asyncio
 from dotenv import load_dotenv
-import time
 
 # Load API Key
 load_dotenv()
@@ -13,6 +13,31 @@ if not API_KEY:
 
 genai.configure(api_key=API_KEY)
 
+PROBE_CONCURRENCY = 5 # Stay well under Google AI's ~60 RPM while scanning
+
+async def probe(sem, short_name):
+    """Send a tiny prompt to one model. Returns (is_working, status text)"""
+    async with sem:
+        try:
+            model = genai.GenerativeModel(short_name)
+            await model.generate_content_async("Hi", request_options={"timeout": 10})
+            return True, "✅ AVAILABLE"
+            
+        except Exception as e:
+            error = str(e).lower()
+            if "429" in error or "quota" in error:
+                return False, "⚠️ RATE LIMITED (Busy)"
+            elif "not found" in error or "404" in error:
+                return False, "❌ NOT FOUND (Deprecated)"
+            else:
+                # Shorten long error messages
+                short_err = str(e)[:20] + "..."
+                return False, f"❌ ERROR: {short_err}"
+
+async def probe_all(model_names):
+    sem = asyncio.Semaphore(PROBE_CONCURRENCY)
+    return await asyncio.gather(*[probe(sem, name) for name in model_names])
+
 print(f"🔍 Scanning available models for your API key...")
 print(f"{'-'*60}")
 print(f"{'MODEL NAME':<30} | {'STATUS':<25}")
@@ -29,34 +54,17 @@ try:
         if 'generateContent' in m.supported_generation_methods:
             valid_models.append(m.name)
 
-    # 2. Test each model
+    # 2. Test all models in parallel
     working_models = []
     
-    for model_name in valid_models:
-        # Strip the "models/" prefix if present for cleaner output
-        short_name = model_name.replace("models/", "")
-        
-        try:
-            model = genai.GenerativeModel(short_name)
-            # Send a tiny prompt to test response
-            response = model.generate_content("Hi", request_options={"timeout": 10})
-            
-            print(f"{short_name:<30} | ✅ AVAILABLE")
+    # Strip the "models/" prefix if present for cleaner output
+    short_names = [name.replace("models/", "") for name in valid_models]
+    results = asyncio.run(probe_all(short_names))
+    
+    for short_name, (is_working, status) in zip(short_names, results):
+        print(f"{short_name:<30} | {status}")
+        if is_working:
             working_models.append(short_name)
-            
-        except Exception as e:
-            error = str(e).lower()
-            if "429" in error or "quota" in error:
-                print(f"{short_name:<30} | ⚠️ RATE LIMITED (Busy)")
-            elif "not found" in error or "404" in error:
-                print(f"{short_name:<30} | ❌ NOT FOUND (Deprecated)")
-            else:
-                # Shorten long error messages
-                short_err = str(e)[:20] + "..."
-                print(f"{short_name:<30} | ❌ ERROR: {short_err}")
-        
-        # Small sleep to prevent self-inflicted rate limits during the test
-        time.sleep(1)
 
     print(f"{'-'*60}")
     print(f"\n✨ RECOMMENDATION:")
@@ -1,13 +1,19 @@
 import os
+import io
 import json
+import shutil
+import tempfile
+import functools
+import hashlib
 import asyncio
 import logging
-import feedparser
-import requests
+import aiohttp
+from lxml import etree
 import google.generativeai as genai
 import edge_tts
 from youtube_transcript_api import YouTubeTranscriptApi
 from pathlib import Path
+from collections import deque
 from dotenv import load_dotenv
 import time
 import random
@@ -27,8 +33,39 @@ logger = logging.getLogger(__name__)
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID")
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+genai.configure(api_key=GEMINI_API_KEY)
 
 HISTORY_FILE = Path("history.json")
+GEMINI_CACHE_FILE = Path("gemini_cache.json")
+FEED_CACHE_FILE = Path("feed_cache.json")
+MODELS_CACHE_FILE = Path("models_cache.json")
+MODELS_CACHE_TTL = 24 * 60 * 60 # Re-check which models exist once a day
+TRANSCRIPT_TOKEN_BUDGET = 12500 # ~50k chars of English; plenty for a 45s script
+NUCLEAR_MAX_DURATION = 15 * 60 # Don't download + transcribe audio for longer videos
+FEED_CONCURRENCY = 10 # Max feeds fetched at the same time
+FEED_NS = {"a": "http://www.w3.org/2005/Atom", "yt": "http://www.youtube.com/xml/schemas/2015"}
+FEED_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+GEMINI_CONCURRENCY = 8 # Max Gemini calls in flight (Google AI default)
+TELEGRAM_CONCURRENCY = 1 # One chat: keep each post + voice note together and honor the flood-limit pause
+TTS_CONCURRENCY = 4 # Max Edge-TTS syntheses in flight
+YOUTUBE_CONCURRENCY = 2 # Max YouTube hits in flight (too many from one IP = "confirm you're not a bot")
+HTTP_POOL_SIZE = 10 # Keep-alive connections shared by feeds + Telegram
+GEMINI_MAX_RETRIES = 3 # Attempts per model before downgrading
+GEMINI_MAX_BACKOFF = 30 # Seconds; longer waits switch models instead
+GEMINI_RPM = 10 # Requests per minute per model (free-tier-ish)
+
+# Gemini errors carry hints like "retry_delay { seconds: 37 }" or "retry in 37.5s"
+RE_RETRY_AFTER = re.compile(r'retry(?:[-_ ]after|_delay|\s+in)\D{0,20}?(\d+(?:\.\d+)?)')
+
+# Cleanup patterns (compiled once, used for every caption line / script)
+# Negated char classes instead of .*? = linear scan, no backtracking
+RE_VTT_JUNK = re.compile(r'<[^>]+>|&nbsp;|\[[^\]\n]*\]|\([^)\n]*\)') # <c> tags, [Music], (laughs)
+RE_SCRIPT_JUNK = re.compile(r'\*[^*\n]*\*|\[[^\]\n]*\]|\([^)\n]*\)') # *laughs*, [Music], (pause)
+
+GEMINI_SEM = asyncio.Semaphore(GEMINI_CONCURRENCY)
+TELEGRAM_SEM = asyncio.Semaphore(TELEGRAM_CONCURRENCY)
+TTS_SEM = asyncio.Semaphore(TTS_CONCURRENCY)
+YOUTUBE_SEM = asyncio.Semaphore(YOUTUBE_CONCURRENCY)
 
 # --- LOAD FEEDS ---
 try:
@@ -43,83 +80,190 @@ except Exception as e:
     logger.warning(f"⚠️ feeds.json error: {e}. Using empty list.")
     YOUTUBE_FEEDS = []
 
+# --- MASTER PRIORITY LIST ---
+MODEL_PRIORITY = [
+    # --- TIER 1: The Smartest (Try these first) ---
+    'gemini-2.5-flash',
+    'gemini-2.0-flash-exp',       # Often smartest & fastest
+    'gemini-1.5-pro',             # Best for complex reasoning
+    'gemini-1.5-flash',           # Standard workhorse
+    
+    # --- TIER 2: The "Lite" & Fast (High Quota) ---
+    'gemini-2.5-flash-lite',      # New efficient model
+    'gemini-flash-lite-latest',   # Latest lite version
+    'gemini-1.5-flash-8b',        # Extremely fast/cheap
+    
+    # --- TIER 3: Previews & Experimental (Often separate quotas) ---
+    'gemini-2.5-flash-preview-09-2025',
+    'gemini-2.5-flash-lite-preview-09-2025',
+    
+    # --- TIER 4: Open Models (Gemma - Good fallbacks) ---
+    'gemma-3-27b-it',             # Smarter open model
+    'gemma-3-9b-it',              # Mid-range
+    'gemma-3-4b-it',              # Fast
+    'gemma-3-1b-it'               # Ultra-fast/Low quality
+]
+
+@functools.lru_cache(maxsize=1)
+def discover_models():
+    """
+    MODEL_PRIORITY filtered down to what this API key can actually call,
+    so we don't burn a 404 round-trip per dead model. Cached on disk for 24h.
+    """
+    available = None
+    if MODELS_CACHE_FILE.exists():
+        try:
+            data = json.loads(MODELS_CACHE_FILE.read_text())
+            if time.time() - data["saved_at"] < MODELS_CACHE_TTL:
+                available = set(data["available"])
+        except Exception as e:
+            logger.warning(f"Could not load models cache: {e}")
+    
+    if available is None:
+        try:
+            available = {
+                m.name.replace("models/", "") for m in genai.list_models()
+                if 'generateContent' in m.supported_generation_methods
+            }
+            MODELS_CACHE_FILE.write_text(
+                json.dumps({"saved_at": time.time(), "available": sorted(available)}, indent=2)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not list models ({e}). Trying the full list.")
+            return MODEL_PRIORITY
+    
+    models = [name for name in MODEL_PRIORITY if name in available]
+    return models or MODEL_PRIORITY
+
+@functools.lru_cache(maxsize=16)
+def get_model(model_name):
+    """One GenerativeModel per name, reused across calls"""
+    return genai.GenerativeModel(model_name)
+
+# --- RATE LIMITER (Per Model) ---
+class RateLimiter:
+    """
+    Sliding-window RPM limiter with one window per model.
+    Halves a model's budget on 429 and wins it back +1 RPM per minute of success (AIMD).
+    """
+    def __init__(self, rpm):
+        self.max_rpm = rpm
+        self.rpm = {}           # model -> current allowed requests per minute
+        self.calls = {}         # model -> deque of call timestamps in the last minute
+        self.last_increase = {} # model -> when we last bumped the budget back up
+
+    async def acquire(self, model_name, max_wait):
+        """
+        Wait until the model's window has room, then record the call and return True.
+        Returns False right away if that wait would exceed max_wait (better to switch models).
+        """
+        calls = self.calls.setdefault(model_name, deque())
+        while True:
+            now = time.monotonic()
+            while calls and now - calls[0] >= 60:
+                calls.popleft()
+            limit = int(self.rpm.get(model_name, self.max_rpm))
+            if len(calls) < limit:
+                calls.append(now)
+                return True
+            # Room opens when enough old calls age out to drop below the limit
+            wait = 60 - (now - calls[len(calls) - limit])
+            if wait > max_wait:
+                return False
+            await asyncio.sleep(wait)
+
+    def on_rate_limited(self, model_name):
+        self.rpm[model_name] = max(1, self.rpm.get(model_name, self.max_rpm) * 0.5)
+        self.last_increase[model_name] = time.monotonic()
+
+    def on_success(self, model_name):
+        rpm = self.rpm.get(model_name, self.max_rpm)
+        now = time.monotonic()
+        if rpm < self.max_rpm and now - self.last_increase.get(model_name, 0) >= 60:
+            self.rpm[model_name] = min(self.max_rpm, rpm + 1)
+            self.last_increase[model_name] = now
+
+GEMINI_LIMITER = RateLimiter(GEMINI_RPM)
+
 # --- FALLBACK GENERATOR (Master List) ---
-def generate_with_fallback(prompt_parts):
+def backoff_delay(attempt, error_msg):
+    """
+    Exponential backoff with jitter. Honors the server's retry hint if the error has one.
+    Returns None when the wait would be too long to be worth it (better to switch models).
+    """
+    delay = 2 ** attempt + random.uniform(0, 1)
+    match = RE_RETRY_AFTER.search(error_msg)
+    if match:
+        delay = max(delay, float(match.group(1)))
+    return delay if delay <= GEMINI_MAX_BACKOFF else None
+
+async def generate_with_fallback(prompt_parts, generation_config=None):
     """
     Tries ALL known Gemini models in order of capability.
     Handles Rate Limits (429) and Not Found (404) errors gracefully.
     """
-    # MASTER PRIORITY LIST
-    models_to_try = [
-        # --- TIER 1: The Smartest (Try these first) ---
-        'gemini-2.5-flash'
-        'gemini-2.0-flash-exp',       # Often smartest & fastest
-        'gemini-1.5-pro',             # Best for complex reasoning
-        'gemini-1.5-flash',           # Standard workhorse
-        
-        # --- TIER 2: The "Lite" & Fast (High Quota) ---
-        'gemini-2.5-flash-lite',      # New efficient model
-        'gemini-flash-lite-latest',   # Latest lite version
-        'gemini-1.5-flash-8b',        # Extremely fast/cheap
-        
-        # --- TIER 3: Previews & Experimental (Often separate quotas) ---
-        'gemini-2.5-flash-preview-09-2025',
-        'gemini-2.5-flash-lite-preview-09-2025',
-        
-        # --- TIER 4: Open Models (Gemma - Good fallbacks) ---
-        'gemma-3-27b-it',             # Smarter open model
-        'gemma-3-9b-it',              # Mid-range
-        'gemma-3-4b-it',              # Fast
-        'gemma-3-1b-it'               # Ultra-fast/Low quality
-    ]
+    models_to_try = discover_models()
     
-    genai.configure(api_key=GEMINI_API_KEY)
-
     for model_name in models_to_try:
-        try:
-            # logger.info(f"🧠 Asking {model_name}...")
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt_parts)
-            return response.text
-            
-        except Exception as e:
-            error_msg = str(e).lower()
-            
-            # 1. Handle Rate Limits (Busy)
-            if "429" in error_msg or "quota" in error_msg:
-                logger.warning(f"⚠️ {model_name} is Busy/Rate Limited. Switching to next...")
-                time.sleep(1) # Short pause to be polite
-                continue
-            
-            # 2. Handle 404 (Model doesn't exist/deprecated)
-            elif "404" in error_msg or "not found" in error_msg:
-                # logger.warning(f"⚠️ {model_name} not found. Skipping.")
-                continue
+        # logger.info(f"🧠 Asking {model_name}...")
+        model = get_model(model_name)
+        config = generation_config
+        
+        # Retry the SAME model a few times before downgrading to the next one
+        for attempt in range(GEMINI_MAX_RETRIES):
+            try:
+                if not await GEMINI_LIMITER.acquire(model_name, max_wait=GEMINI_MAX_BACKOFF):
+                    logger.warning(f"⚠️ {model_name} is throttled. Switching to next...")
+                    break
+                async with GEMINI_SEM:
+                    response = await model.generate_content_async(prompt_parts, generation_config=config)
+                GEMINI_LIMITER.on_success(model_name)
+                return response.text
                 
-            # 3. Handle Overloaded/Server Errors
-            elif "503" in error_msg or "overloaded" in error_msg:
-                logger.warning(f"⚠️ {model_name} Overloaded. Switching...")
-                time.sleep(2)
-                continue
+            except Exception as e:
+                error_msg = str(e).lower()
                 
-            # 4. Other Errors (Safety, etc.)
-            else:
-                logger.warning(f"⚠️ {model_name} Error: {e}. Switching...")
-                continue
+                # 1. Handle Rate Limits (Busy) & Overloaded/Server Errors
+                if any(code in error_msg for code in ("429", "quota", "503", "overloaded")):
+                    if "429" in error_msg or "quota" in error_msg:
+                        GEMINI_LIMITER.on_rate_limited(model_name)
+                    delay = backoff_delay(attempt, error_msg)
+                    if delay is None or attempt == GEMINI_MAX_RETRIES - 1:
+                        logger.warning(f"⚠️ {model_name} is Busy/Overloaded. Switching to next...")
+                        break
+                    logger.warning(f"⚠️ {model_name} is Busy/Overloaded. Retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+                    continue
+                
+                # 2. Handle 404 (Model doesn't exist/deprecated)
+                elif "404" in error_msg or "not found" in error_msg:
+                    # logger.warning(f"⚠️ {model_name} not found. Skipping.")
+                    break
+                    
+                # 3. Model has no JSON mode (e.g. Gemma): ask again without it, the prompt still says JSON
+                elif config and "json mode" in error_msg:
+                    config = None
+                    continue
+                    
+                # 4. Other Errors (Safety, etc.)
+                else:
+                    logger.warning(f"⚠️ {model_name} Error: {e}. Switching...")
+                    break
     
     logger.error("❌ ALL models failed. Your API key is likely completely exhausted for the day.")
     return None
 
 # --- HELPER FUNCTIONS ---
 def load_history():
+    """Seen video IDs, oldest first (a dict keeps order AND gives O(1) lookups)"""
     if HISTORY_FILE.exists():
         try:
             data = json.loads(HISTORY_FILE.read_text())
-            return set(data.get("videos", []))
+            return dict.fromkeys(data.get("videos", []))
         except Exception as e:
             logger.warning(f"Could not load history: {e}")
-            return set()
-    return set()
+            return {}
+    return {}
 
 def save_history(history):
     try:
@@ -133,12 +277,78 @@ def save_history(history):
     except Exception as e:
         logger.error(f"Failed to save history: {e}")
 
-def get_transcript(video_id):
+def load_feed_cache():
+    """Per-feed ETag/Last-Modified from last run (kept out of history.json, which gets committed)"""
+    if FEED_CACHE_FILE.exists():
+        try:
+            return json.loads(FEED_CACHE_FILE.read_text())
+        except Exception as e:
+            logger.warning(f"Could not load feed cache: {e}")
+            return {}
+    return {}
+
+def save_feed_cache(feed_cache):
+    try:
+        FEED_CACHE_FILE.write_text(json.dumps(feed_cache, indent=2))
+    except Exception as e:
+        logger.error(f"Failed to save feed cache: {e}")
+
+def load_cache():
+    if GEMINI_CACHE_FILE.exists():
+        try:
+            return json.loads(GEMINI_CACHE_FILE.read_text())
+        except Exception as e:
+            logger.warning(f"Could not load Gemini cache: {e}")
+            return {}
+    return {}
+
+def save_cache(cache):
+    try:
+        cache_items = list(cache.items())
+        if len(cache_items) > 1000: # Keep file size manageable (oldest drop first)
+            cache_items = cache_items[-1000:]
+        
+        GEMINI_CACHE_FILE.write_text(
+            json.dumps(dict(cache_items), indent=2)
+        )
+    except Exception as e:
+        logger.error(f"Failed to save Gemini cache: {e}")
+
+def run_ytdlp(ydl_opts, url):
+    """Blocking yt-dlp download (call through asyncio.to_thread)"""
+    import yt_dlp
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.download([url])
+
+async def youtube_call(func, *args, **kwargs):
+    """Run a blocking YouTube call (transcript API / yt-dlp) in a worker thread, bounded by YOUTUBE_SEM"""
+    async with YOUTUBE_SEM:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+def get_duration(ydl_opts, url):
+    """Video length in seconds from a metadata-only yt-dlp lookup (None if unknown)"""
+    import yt_dlp
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+        return (info or {}).get("duration")
+    except Exception:
+        return None
+
+async def get_transcript(video_id):
+    # Private scratch dir per video so parallel yt-dlp runs never touch each other's files
+    workdir = Path(tempfile.mkdtemp(prefix=f"yt_{video_id}_"))
+    try:
+        return await fetch_transcript(video_id, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+async def fetch_transcript(video_id, workdir):
     logger.info(f"🕵️ Fetching transcript for {video_id}...")
     
     # --- METHOD 1: API (Fastest) ---
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+        transcript_list = await youtube_call(YouTubeTranscriptApi.get_transcript, video_id)
         text = " ".join([entry['text'] for entry in transcript_list])
         return text
     except Exception:
@@ -146,41 +356,31 @@ def get_transcript(video_id):
 
     # --- METHOD 2: yt-dlp (Robust Fallback for Captions) ---
     try:
-        import yt_dlp
-        time.sleep(random.uniform(2, 5)) 
-        
         url = f"https://youtu.be/{video_id}"
         ydl_opts = {
             'skip_download': True,
             'writeautomaticsub': True,
             'subtitleslangs': ['en'],
-            'outtmpl': f'transcript_{video_id}',
+            'outtmpl': str(workdir / f'transcript_{video_id}'),
             'quiet': True,
             'nocheckcertificate': True,
             'ignoreerrors': True,
         }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        async with YOUTUBE_SEM:
+            await asyncio.sleep(random.uniform(2, 5)) # Pace requests from this IP
+            await asyncio.to_thread(run_ytdlp, ydl_opts, url)
         
         # Check for caption file
         found_text = None
-        for file in os.listdir("."):
-            if file.startswith(f"transcript_{video_id}") and file.endswith(".vtt"):
-                with open(file, "r", encoding="utf-8") as f:
-                    content = f.read()
-                os.remove(file) # Cleanup
-                
-                # Cleaning VTT junk
-                lines = content.splitlines()
-                text = []
-                for line in lines:
-                    if "-->" not in line and "WEBVTT" not in line and line.strip():
-                        clean_line = line.replace("<c>", "").replace("</c>", "").replace("&nbsp;", " ")
-                        clean_line = re.sub(r'\[.*?\]', '', clean_line)
-                        clean_line = re.sub(r'\(.*?\)', '', clean_line)
-                        text.append(clean_line)
-                found_text = " ".join(text)
-                break
+        for file in workdir.glob(f"transcript_{video_id}*.vtt"):
+            # Cleaning VTT junk (streamed line by line, no full copy in memory)
+            with open(file, "r", encoding="utf-8") as f:
+                found_text = " ".join(
+                    RE_VTT_JUNK.sub(' ', line.strip()) for line in f
+                    if line.strip() and "-->" not in line and "WEBVTT" not in line
+                )
+            file.unlink() # Cleanup
+            break
         
         if found_text:
             return found_text
@@ -190,37 +390,46 @@ def get_transcript(video_id):
 
     # --- METHOD 3: The Nuclear Option (Download Audio + Gemini Listen) ---
     try:
-        import yt_dlp
+        from yt_dlp.utils import download_range_func
         logger.info("☢️ Nuclear Option: Listening to audio...")
         
-        filename = f"audio_{video_id}"
+        filename = workdir / f"audio_{video_id}"
         ydl_opts = {
             'format': 'bestaudio/best',
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
-                'preferredquality': '64',
+                'preferredquality': '24',
             }],
-            'outtmpl': filename,
+            # Mono 16kHz is plenty for speech and shrinks the upload to Gemini
+            'postprocessor_args': {'extractaudio': ['-ac', '1', '-ar', '16000']},
+            'download_ranges': download_range_func(None, [(0, NUCLEAR_MAX_DURATION)]),
+            'outtmpl': str(filename),
             'quiet': True,
         }
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([f"https://youtu.be/{video_id}"])
+        # Cheap metadata check first: long videos cost minutes of download + upload
+        duration = await youtube_call(get_duration, ydl_opts, f"https://youtu.be/{video_id}")
+        if duration and duration > NUCLEAR_MAX_DURATION:
+            logger.warning(f"⏭️ Skipping Nuclear Option: video is {duration // 60} min long")
+            return None
+        
+        await youtube_call(run_ytdlp, ydl_opts, f"https://youtu.be/{video_id}")
             
         final_audio_file = f"{filename}.mp3"
             
         if os.path.exists(final_audio_file):
-            genai.configure(api_key=GEMINI_API_KEY)
-            uploaded_file = genai.upload_file(final_audio_file)
+            uploaded_file = await asyncio.to_thread(genai.upload_file, final_audio_file)
             
-            # Wait for processing
+            # Wait for processing (poll fast at first, back off for long clips)
+            delay = 0.5
             while uploaded_file.state.name == "PROCESSING":
-                time.sleep(2)
-                uploaded_file = genai.get_file(uploaded_file.name)
+                await asyncio.sleep(delay)
+                delay = min(delay * 1.5, 5)
+                uploaded_file = await asyncio.to_thread(genai.get_file, uploaded_file.name)
             
             # USE FALLBACK GENERATOR HERE
-            transcript_text = generate_with_fallback([
+            transcript_text = await generate_with_fallback([
                 "Listen to this audio and generate a full transcript of what is being said. Do not summarize, just transcribe.",
                 uploaded_file
             ])
@@ -239,13 +448,39 @@ def get_transcript(video_id):
         logger.error(f"❌ Nuclear Option failed: {e}")
         return None
 
-def analyze_video(transcript, channel_name, video_title, video_url):
+def truncate_to_tokens(text, max_tokens):
+    """
+    Cut text to roughly max_tokens tokens without an API call.
+    English runs ~4 chars per token, but other scripts are closer to 1 char per token,
+    so a plain character cut over-fills the prompt for non-English transcripts.
+    """
+    if text.isascii():
+        return text[:max_tokens * 4]
+    
+    tokens = 0.0
+    for i, ch in enumerate(text):
+        tokens += 0.25 if ch.isascii() else 1
+        if tokens > max_tokens:
+            return text[:i]
+    return text
+
+async def analyze_video(transcript, channel_name, video_title, video_url):
+    transcript = truncate_to_tokens(transcript, TRANSCRIPT_TOKEN_BUDGET)
+    
+    # Same transcript + title = same answer, so don't pay for it twice (reruns, testing)
+    cache_key = hashlib.blake2b((transcript + video_title).encode("utf-8")).hexdigest()
+    cache = load_cache()
+    if cache_key in cache:
+        logger.info(f"💾 Cache hit for: {video_title}")
+        cache[cache_key] = cache.pop(cache_key) # Mark as recently used
+        save_cache(cache)
+        return cache[cache_key]
     
     prompt = f"""
     You are a high-energy, joyful Radio RJ who loves tech. You are talking to your listeners (friends).
     
     VIDEO: "{video_title}" by {channel_name}
-    TRANSCRIPT: {transcript[:50000]}
+    TRANSCRIPT: {transcript}
 
     YOUR TASK:
     1. TELEGRAM POST (Short & Punchy):
@@ -263,136 +498,203 @@ def analyze_video(transcript, channel_name, video_title, video_url):
        - LENGTH: STRICTLY under 45 seconds spoken.
     
     OUTPUT FORMAT:
-    ---TELEGRAM---
-    [Your short text]
-    ---PODCAST---
-    [Your script]
+    Respond with strict JSON: {{"telegram": "[Your short text]", "podcast": "[Your script]"}}
     """
     
-    # USE FALLBACK GENERATOR HERE
-    text = generate_with_fallback(prompt)
+    # USE FALLBACK GENERATOR HERE (JSON mode = no marker parsing to go wrong)
+    text = await generate_with_fallback(prompt, generation_config={"response_mime_type": "application/json"})
     
     if not text:
         return None
         
     try:
-        if "---TELEGRAM---" not in text or "---PODCAST---" not in text:
-            logger.warning("⚠️ AI response missing markers")
-            return None
-            
-        parts = text.split("---PODCAST---")
-        telegram_txt = parts[0].replace("---TELEGRAM---", "").strip()
-        podcast_txt = parts[1].strip()
+        # Models without JSON mode may wrap it in ```json fences, so keep just the object
+        data = json.loads(text[text.find("{"):text.rfind("}") + 1])
+        telegram_txt = data["telegram"].strip()
         
-        # FINAL CLEANUP
-        podcast_txt = re.sub(r'\*.*?\*', '', podcast_txt)
-        podcast_txt = re.sub(r'\[.*?\]', '', podcast_txt)
-        podcast_txt = re.sub(r'\(.*?\)', '', podcast_txt)
+        # FINAL CLEANUP (one pass, in case stage directions slip into the spoken script)
+        podcast_txt = RE_SCRIPT_JUNK.sub('', data["podcast"]).strip()
         
-        return {
+        content = {
             "telegram": f"{telegram_txt}\n\n🔗 {video_url}",
             "podcast": podcast_txt
         }
+        
+        # Reload so we don't clobber entries written by videos running in parallel
+        cache = load_cache()
+        cache[cache_key] = content
+        save_cache(cache)
+        return content
     except Exception as e:
         logger.error(f"Parsing error: {e}")
         return None
 
 async def generate_audio(script):
-    """Generate audio with Guy (Radio Host)"""
+    """Generate audio with Guy (Radio Host). Returns the MP3 bytes (kept in memory, no temp file)"""
     try:
         voice = "en-US-GuyNeural" 
         communicate = edge_tts.Communicate(script, voice, rate="+10%", pitch="+0Hz")
-        await communicate.save("story.mp3")
-        return True
+        buf = io.BytesIO()
+        async with TTS_SEM:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    buf.write(chunk["data"])
+        return buf.getvalue() or None
     except Exception as e:
         logger.error(f"❌ TTS failed: {e}")
-        return False
+        return None
 
-async def send_to_telegram(telegram_msg, audio_file):
-    """Send to Telegram"""
+async def send_to_telegram(session, telegram_msg, audio_bytes):
+    """Send to Telegram (reuses the shared keep-alive session)"""
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        data = {
-            "chat_id": TELEGRAM_CHAT_ID,
-            "text": telegram_msg,
-            "parse_mode": "Markdown", 
-            "disable_web_page_preview": False
-        }
-        
-        response = requests.post(url, data=data)
-        
-        if response.status_code == 400:
-            logger.warning("⚠️ Markdown failed. Resending as plain text...")
-            data["parse_mode"] = None 
-            response = requests.post(url, data=data)
+        async with TELEGRAM_SEM:
+            url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
+            data = {
+                "chat_id": TELEGRAM_CHAT_ID,
+                "text": telegram_msg,
+                "parse_mode": "Markdown", 
+                "disable_web_page_preview": "false"
+            }
             
-        response.raise_for_status()
-        
-        if audio_file and Path(audio_file).exists():
-            with open(audio_file, "rb") as f:
-                requests.post(
-                    f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendVoice",
-                    data={"chat_id": TELEGRAM_CHAT_ID},
-                    files={"voice": f}
-                )
-            Path(audio_file).unlink()
+            async with session.post(url, data=data) as response:
+                status = response.status
+            
+            if status == 400:
+                logger.warning("⚠️ Markdown failed. Resending as plain text...")
+                data.pop("parse_mode")
+                async with session.post(url, data=data) as response:
+                    response.raise_for_status()
+            else:
+                response.raise_for_status()
+            
+            # The post is out, so the video counts as delivered from here on:
+            # a failed voice note is only logged, never a reason to re-send the text next run
+            if audio_bytes:
+                try:
+                    form = aiohttp.FormData()
+                    form.add_field("chat_id", TELEGRAM_CHAT_ID)
+                    form.add_field("voice", audio_bytes, filename="story.mp3", content_type="audio/mpeg")
+                    async with session.post(f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendVoice", data=form) as response:
+                        response.raise_for_status()
+                except Exception as e:
+                    logger.error(f"❌ Telegram voice note failed (text already sent): {e}")
+            
+            await asyncio.sleep(2) # Stay under Telegram's per-chat flood limit
         
         return True
     except Exception as e:
         logger.error(f"❌ Telegram error: {e}")
         return False
 
-# --- MAIN LOOP ---
-async def main():
-    logger.info("🚀 Starting AI News Anchor...")
-    
-    history = load_history()
-    new_videos = []
-    
-    feed_urls = [f.strip() for f in YOUTUBE_FEEDS if f.strip()]
+async def fetch_feed(session, sem, feed_url, validators):
+    """
+    Fetch one RSS feed and return (its LATEST video or None, ETag/Last-Modified for next run).
+    Sends last run's validators so an unchanged feed answers 304 with no body to parse.
+    """
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("modified"):
+        headers["If-Modified-Since"] = validators["modified"]
     
-    for feed_url in feed_urls:
+    async with sem:
         try:
-            feed = feedparser.parse(feed_url)
-            if not feed.entries:
-                continue
-                
+            async with session.get(feed_url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                if response.status == 304:
+                    return None, validators
+                response.raise_for_status()
+                body = await response.read()
+                new_validators = {
+                    "etag": response.headers.get("ETag"),
+                    "modified": response.headers.get("Last-Modified")
+                }
+            
+            # YouTube feeds are plain Atom; lxml (C) reads the few fields we need directly
+            root = etree.fromstring(body, FEED_PARSER)
+            
             # Only check the LATEST video from each channel to save API calls
-            entry = feed.entries[0]
-            vid_id = entry.yt_videoid
+            entry = root.find("a:entry", FEED_NS)
+            if entry is None:
+                return None, new_validators
             
-            if vid_id not in history:
-                new_videos.append({
-                    "id": vid_id,
-                    "title": entry.title,
-                    "url": entry.link,
-                    "channel": feed.feed.title
-                })
+            return {
+                "id": entry.findtext("yt:videoId", namespaces=FEED_NS),
+                "title": entry.findtext("a:title", namespaces=FEED_NS),
+                "url": entry.find("a:link", FEED_NS).get("href"),
+                "channel": root.findtext("a:title", namespaces=FEED_NS)
+            }, new_validators
         except Exception as e:
             logger.error(f"❌ Feed error for {feed_url}: {e}")
+            return None, validators
+
+async def process_video(session, video):
+    """Transcript -> Gemini -> TTS -> Telegram for one video. Returns True once delivered."""
+    logger.info(f"\n🎬 Processing: {video['title']}")
     
-    logger.info(f"📺 Found {len(new_videos)} new videos")
+    transcript = await get_transcript(video["id"])
+    if not transcript:
+        return False
     
-    for video in new_videos:
-        logger.info(f"\n🎬 Processing: {video['title']}")
-        
-        transcript = get_transcript(video["id"])
-        if not transcript:
-            continue
+    content = await analyze_video(transcript, video["channel"], video["title"], video["url"])
+    if not content:
+        return False
+    
+    audio_bytes = await generate_audio(content["podcast"])
+    
+    success = await send_to_telegram(session, content["telegram"], audio_bytes)
+    
+    if success:
+        logger.info(f"✅ Delivered: {video['title']}")
+    return success
+
+# --- MAIN LOOP ---
+async def main():
+    logger.info("🚀 Starting AI News Anchor...")
+    
+    history = load_history()
+    feed_cache = load_feed_cache()
+    
+    feed_urls = [f.strip() for f in YOUTUBE_FEEDS if f.strip()]
+    
+    # One pooled session for the whole run: feeds + Telegram reuse keep-alive connections
+    connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # Fetch all feeds in parallel (network bound, so total time ~ slowest feed)
+        sem = asyncio.Semaphore(FEED_CONCURRENCY)
+        fetched = await asyncio.gather(*[
+            fetch_feed(session, sem, url, feed_cache.get(url, {})) for url in feed_urls
+        ])
         
-        content = analyze_video(transcript, video["channel"], video["title"], video["url"])
-        if not content:
-            continue
+        new_videos = [video for video, _ in fetched if video and video["id"] not in history]
         
-        audio_ok = await generate_audio(content["podcast"])
+        logger.info(f"📺 Found {len(new_videos)} new videos")
         
-        success = await send_to_telegram(content["telegram"], "story.mp3" if audio_ok else None)
+        if new_videos:
+            # Warm the model list off the event loop so no video task blocks on it
+            await asyncio.to_thread(discover_models)
         
-        if success:
-            history.add(video["id"])
-            save_history(history)
-            logger.info(f"✅ Delivered: {video['title']}")
-            time.sleep(2)
+        # All videos run through the pipeline at once; the semaphores keep us under rate limits
+        results = await asyncio.gather(*[process_video(session, video) for video in new_videos], return_exceptions=True)
+    
+    for video, result in zip(new_videos, results):
+        if isinstance(result, BaseException):
+            logger.error(f"❌ {video['title']} crashed: {result!r}", exc_info=result)
+    
+    delivered = [video["id"] for video, ok in zip(new_videos, results) if ok is True]
+    history.update(dict.fromkeys(delivered))
+    
+    # Only keep a feed's validators once its latest video is in history,
+    # otherwise a 304 next run would hide a video we failed to deliver
+    new_feed_cache = {
+        url: validators for url, (video, validators) in zip(feed_urls, fetched)
+        if any(validators.values()) and (video is None or video["id"] in history)
+    }
+    
+    # Written once per run (not per video) and only if something changed
+    if delivered:
+        save_history(history)
+    if new_feed_cache != feed_cache:
+        save_feed_cache(new_feed_cache)
     
     logger.info("\n✨ Processing complete!")
 